@@ -0,0 +1,106 @@
+from array import array
+import time
+import WarmStart
+
+numpy = WarmStart.lazy_import('numpy')
+pandas = WarmStart.lazy_import('pandas')
+
+STREETS = ('Pre-flop', 'Flop', 'Turn', 'River')
+PLAYER_ACTIONS = ('fold', 'check', 'call', 'raise', 'all-in')
+# Forced bets are logged too, so the pot can be rebuilt from the log
+ACTIONS = PLAYER_ACTIONS + ('blind',)
+
+# One fixed-width record per action, stored column by column (23 bytes per action)
+FIELDS = (
+    ('hand_id', 'I'),
+    ('street', 'B'),
+    ('seat', 'B'),
+    ('action', 'B'),
+    ('amount', 'i'),
+    ('pot', 'i'),
+    ('timestamp', 'd'),
+)
+
+STREET_CODES = {street: code for code, street in enumerate(STREETS)}
+ACTION_CODES = {action: code for code, action in enumerate(ACTIONS)}
+
+
+class ActionLog:
+    """Compact log of betting actions backed by one typed array per field."""
+
+    def __init__(self, capacity=1024):
+        self.hand_id = 0
+        self._size = 0
+        self._capacity = capacity
+        self._columns = {name: array(typecode, bytes(array(typecode).itemsize * capacity))
+                         for name, typecode in FIELDS}
+
+    def __len__(self):
+        return self._size
+
+    def new_hand(self):
+        """Start logging a new hand and return its id."""
+        self.hand_id += 1
+        return self.hand_id
+
+    def append(self, street, seat, action, amount, pot, timestamp=None):
+        """Record a single action."""
+        if self._size == self._capacity:
+            self._grow()
+        row = self._size
+        columns = self._columns
+        columns['hand_id'][row] = self.hand_id
+        columns['street'][row] = STREET_CODES[street]
+        columns['seat'][row] = seat
+        columns['action'][row] = ACTION_CODES[action]
+        columns['amount'][row] = int(amount)
+        columns['pot'][row] = int(pot)
+        columns['timestamp'][row] = time.time() if timestamp is None else timestamp
+        self._size += 1
+
+    def _grow(self):
+        # Copy into new, larger arrays instead of resizing in place: arrays can't be
+        # resized while exported, and earlier views keep the old buffers alive
+        for name, column in self._columns.items():
+            grown = array(column.typecode, column)
+            grown.frombytes(bytes(column.itemsize * self._capacity))
+            self._columns[name] = grown
+        self._capacity *= 2
+
+    def _bounds(self, start, stop):
+        start, stop, _ = slice(start, stop).indices(self._size)
+        return start, max(start, stop)
+
+    def column(self, name, start=0, stop=None):
+        """Return a zero-copy memoryview of one field over the given rows."""
+        start, stop = self._bounds(start, stop)
+        return memoryview(self._columns[name])[start:stop]
+
+    def window(self, last_n):
+        """Return zero-copy memoryviews of every field over the last_n actions."""
+        start = max(self._size - last_n, 0)
+        return {name: self.column(name, start) for name, _ in FIELDS}
+
+    def row(self, index):
+        """Return a single action as (hand_id, street, seat, action, amount, pot, timestamp)."""
+        if not -self._size <= index < self._size:
+            raise IndexError("action log index out of range")
+        index %= self._size
+        return (self._columns['hand_id'][index],
+                STREETS[self._columns['street'][index]],
+                self._columns['seat'][index],
+                ACTIONS[self._columns['action'][index]],
+                self._columns['amount'][index],
+                self._columns['pot'][index],
+                self._columns['timestamp'][index])
+
+    def to_numpy(self, start=0, stop=None):
+        """Return a dict of NumPy arrays that share memory with the log."""
+        start, stop = self._bounds(start, stop)
+        return {name: numpy.frombuffer(self._columns[name], dtype=typecode,
+                                       count=stop - start, offset=start * self._columns[name].itemsize)
+                for name, typecode in FIELDS}
+
+    def to_dataframe(self, start=0, stop=None):
+        """Return the log as a pandas DataFrame built on the NumPy views, without copying."""
+        return pandas.DataFrame(self.to_numpy(start, stop), copy=False)
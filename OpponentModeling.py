@@ -1,7 +1,24 @@
-import pandas as pd
-from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.metrics import classification_report, accuracy_score
+import WarmStart
+from ActionLog import PLAYER_ACTIONS
+
+# Heavy dependencies are only loaded the first time they are used, so importing this
+# module (e.g. from the advisor) stays cheap on a cold start
+numpy = WarmStart.lazy_import('numpy')
+pandas = WarmStart.lazy_import('pandas')
+
+# Population action frequencies used until an opponent's own history builds up. This table
+# is the global prior the online model blends with: the batch RandomForest trained below
+# is placeholder-only (its features are stand-ins) and predicts hand strength, not action
+# frequencies, so it can't serve as one.
+PRIOR_ACTION_FREQUENCIES = {'fold': 0.30, 'check': 0.20,
+                            'call': 0.30, 'raise': 0.15, 'all-in': 0.05}
+PRIOR_FOLD_RATE = PRIOR_ACTION_FREQUENCIES['fold']
+PRIOR_ACTION_WEIGHT = 10  # How many observed actions the prior is worth
+RECENCY_DECAY = 0.95  # Weight kept by older actions each time a new one is observed
+AGGRESSION_THRESHOLD = 0.35  # Raise/all-in frequency above which an opponent counts as aggressive
+MIN_ACTION_WEIGHT = 0.25  # Bounds on how much a single action moves the hand prediction
+MAX_ACTION_WEIGHT = 2.0
+MAX_FOLD_PROBABILITY = 0.95  # Nobody folds every time, however big the bet
 
 
 def extract_features(dataframe):
@@ -20,29 +37,111 @@ def extract_features(dataframe):
     return features, labels
 
 
-# Load your dataset
-dataframe = pd.read_csv('/path/to/your/poker_data.csv')
+def load_dataset(path):
+    """Load the raw poker data into a dataframe."""
+    return pandas.read_csv(path)
+
+
+def train_model(features, labels):
+    """Train the opponent model and print its accuracy on a held-out test set."""
+    # sklearn's submodules can't be lazy-loaded without importing sklearn itself, and only
+    # offline training needs them, so they are imported here
+    from sklearn.model_selection import train_test_split
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.metrics import classification_report, accuracy_score
+
+    # Split the dataset into training set and test set
+    X_train, X_test, y_train, y_test = train_test_split(
+        features, labels, test_size=0.2, random_state=42)
+
+    # Initialize the machine learning model
+    model = RandomForestClassifier(n_estimators=100, random_state=42)
+
+    # Train the model
+    model.fit(X_train, y_train)
+
+    # Predict on the test set
+    predictions = model.predict(X_test)
+
+    # Evaluate the predictions
+    print(classification_report(y_test, predictions))
+    print("Accuracy:", accuracy_score(y_test, predictions))
+    return model
+
+
+def fold_probabilities(bet_fractions, fold_rate):
+    """Estimate how often an opponent with the given fold rate folds to each bet size (fractions of the pot)."""
+    bet_fractions = numpy.asarray(bet_fractions, dtype=float)
 
-# Extract features and labels
-features, labels = extract_features(dataframe)
+    # A balanced opponent folds bet / (pot + bet) of the time; scale that by how much
+    # more or less often than the population this opponent actually folds
+    balanced_folds = bet_fractions / (1 + bet_fractions)
+    return numpy.clip(balanced_folds * fold_rate / PRIOR_FOLD_RATE, 0, MAX_FOLD_PROBABILITY)
 
-# Split the dataset into training set and test set
-X_train, X_test, y_train, y_test = train_test_split(
-    features, labels, test_size=0.2, random_state=42)
 
-# Initialize the machine learning model
-model = RandomForestClassifier(n_estimators=100, random_state=42)
+class OnlineOpponentModel:
+    """Per-opponent action frequencies that are updated with every observed action.
 
-# Train the model
-model.fit(X_train, y_train)
+    Each opponent's actions are counted with exponential decay, so recent behaviour
+    dominates, and blended with PRIOR_ACTION_FREQUENCIES, so a handful of actions can't
+    swing the estimate too far. Updates are a few float operations and predictions
+    reflect them immediately, without any retraining.
+    """
 
+    def __init__(self, prior=PRIOR_ACTION_FREQUENCIES, prior_weight=PRIOR_ACTION_WEIGHT, decay=RECENCY_DECAY):
+        self.prior = {action: prior[action] for action in PLAYER_ACTIONS}
+        self.prior_weight = prior_weight
+        self.decay = decay
+        self._counts = {}  # opponent id -> decayed count per action
+        self._totals = {}  # opponent id -> sum of the decayed counts
 
-# Predict on the test set
-predictions = model.predict(X_test)
+    def observe(self, opponent_id, action):
+        """Update the opponent's state with a single action."""
+        counts = self._counts.get(opponent_id)
+        if counts is None:
+            counts = self._counts[opponent_id] = dict.fromkeys(
+                PLAYER_ACTIONS, 0.0)
+            self._totals[opponent_id] = 0.0
+        for known_action in counts:
+            counts[known_action] *= self.decay
+        counts[action] += 1
+        self._totals[opponent_id] = self._totals[opponent_id] * self.decay + 1
 
-# Evaluate the predictions
-print(classification_report(y_test, predictions))
-print("Accuracy:", accuracy_score(y_test, predictions))
+    def action_probability(self, opponent_id, action):
+        """Return how likely the opponent is to take the action, blended with the prior."""
+        counts = self._counts.get(opponent_id)
+        if counts is None:
+            return self.prior[action]
+        return (counts[action] + self.prior_weight * self.prior[action]) / \
+            (self._totals[opponent_id] + self.prior_weight)
+
+    def action_probabilities(self, opponent_id):
+        """Return the blended probability of every action for the opponent."""
+        return {action: self.action_probability(opponent_id, action) for action in PLAYER_ACTIONS}
+
+    def aggression(self, opponent_id):
+        """Return how often the opponent raises or moves all-in."""
+        return self.action_probability(opponent_id, 'raise') + self.action_probability(opponent_id, 'all-in')
+
+    def profile(self, opponent_ids):
+        """Classify a group of opponents as 'aggressive' if any of them is, otherwise 'passive'."""
+        if any(self.aggression(opponent_id) > AGGRESSION_THRESHOLD for opponent_id in opponent_ids):
+            return 'aggressive'
+        return 'passive'
+
+    def action_weight(self, opponent_id, action):
+        """Return how much an action says about the opponent's hand.
+
+        Actions the opponent takes less often than the population carry more
+        information (a raise from a tight player), frequent ones carry less.
+        """
+        weight = self.prior[action] / \
+            self.action_probability(opponent_id, action)
+        return min(max(weight, MIN_ACTION_WEIGHT), MAX_ACTION_WEIGHT)
+
+    def fold_probabilities(self, opponent_id, bet_fractions):
+        """Estimate how often the opponent folds to each bet size, given as fractions of the pot."""
+        return fold_probabilities(bet_fractions, self.action_probability(opponent_id, 'fold'))
 
 
 def predict_opponents_hand(model, current_features):
@@ -53,3 +152,14 @@ def predict_opponents_hand(model, current_features):
 # Example usage during a game (you need to provide the current features)
 # current_features = get_current_features(game_state)
 # predicted_strength = predict_opponents_hand(model, current_features)
+
+
+if __name__ == '__main__':
+    # Load your dataset
+    dataframe = load_dataset('/path/to/your/poker_data.csv')
+
+    # Extract features and labels
+    features, labels = extract_features(dataframe)
+
+    # Train the model and report how well it does on held-out data
+    model = train_model(features, labels)
@@ -1,34 +1,51 @@
+from array import array
 from collections import Counter
+import math
 import random
-from itertools import combinations
-from phevaluator import evaluate_cards, Card
-from colorama import Fore, Style
-from tabulate import tabulate
+import sys
+import WarmStart
+import OpponentModeling
+import ActionLog
+
+# Heavy dependencies are only loaded the first time they are used
+phevaluator = WarmStart.lazy_import('phevaluator')
+colorama = WarmStart.lazy_import('colorama')
+tabulate = WarmStart.lazy_import('tabulate')
+numpy = WarmStart.lazy_import('numpy')
 
 # Constants
 NUM_PLAYERS = 5  # Including the user
-user_player_number = int(
-    input(f"Enter your player number (1-{NUM_PLAYERS}): "))
-dealer_position = int(
-    input(f"Enter the initial dealer position (1-{NUM_PLAYERS}): ")) - 1
-
-small_blind_position = (dealer_position + 1) % NUM_PLAYERS
-big_blind_position = (dealer_position + 2) % NUM_PLAYERS
-
-
+MAX_OPPONENTS = NUM_PLAYERS - 1
 NUM_SIMULATIONS = 10000
 INITIAL_CHIP_COUNT = 1000  # Adjust as needed
 SMALL_BLIND = 10
 BIG_BLIND = 20
 MINIMUM_BET = 20  # This could be the same as the big blind or a different value
 opponent_history = {}  # Dictionary to hold the history of each opponent's actions
-betting_history = []  # List to hold the sequence of betting actions
+action_log = ActionLog.ActionLog()  # Compact log of the sequence of betting actions
+# Per-opponent tendencies, updated after every action
+online_model = OpponentModeling.OnlineOpponentModel()
 
 players = [{'id': i + 1, 'status': 'active', 'last_action': None,
             'last_bet': 0, 'chips': INITIAL_CHIP_COUNT} for i in range(NUM_PLAYERS)]
 
 DECK = [r + s for r in '23456789TJQKA' for s in 'SHDC']
 
+# All 169 starting hands in a fixed order ('AA', 'AKs', 'AKo', ..., '22'), so their
+# equities can be stored in a flat table of len(PREFLOP_HANDS) x MAX_OPPONENTS entries
+RANKS = 'AKQJT98765432'
+PREFLOP_HANDS = [high + low + suffix
+                 for i, high in enumerate(RANKS) for low in RANKS[i:]
+                 for suffix in ([''] if high == low else ['s', 'o'])]
+PREFLOP_HAND_INDEX = {hand: index for index, hand in enumerate(PREFLOP_HANDS)}
+PREFLOP_TABLE_SIZE = len(PREFLOP_HANDS) * MAX_OPPONENTS
+
+# Preflop equity table from the warm state snapshot (mapped read-only, NaN = not computed yet).
+# Build it ahead of time with `python PokerPokerPoker.py --build-warm-state`.
+preflop_equity_table = WarmStart.load_snapshot().get('preflop_equity')
+if preflop_equity_table is None or len(preflop_equity_table) != PREFLOP_TABLE_SIZE:
+    preflop_equity_table = array('d', [math.nan]) * PREFLOP_TABLE_SIZE
+
 GTO_STRATEGY_TABLE = {
     0.25: {'value_bet': 0.83, 'bluff': 0.17},
     0.50: {'value_bet': 0.75, 'bluff': 0.25},
@@ -37,15 +54,19 @@ GTO_STRATEGY_TABLE = {
     1.50: {'value_bet': 0.62, 'bluff': 0.38},
     2.00: {'value_bet': 0.60, 'bluff': 0.40}
 }
+
+# Candidate bet sizes (as fractions of the pot) evaluated by the bet size optimizer
+BET_SIZE_GRID = (0.25, 0.33, 0.50, 0.66, 0.75, 1.00, 1.25, 1.50, 2.00, 2.75)
 # Functions
 
 
 def print_header(message):
-    print(f"{Fore.YELLOW}{message}{Style.RESET_ALL}")
+    print(f"{colorama.Fore.YELLOW}{message}{colorama.Style.RESET_ALL}")
 
 
 def print_info(message, value):
-    print(f"{Fore.CYAN}{message}: {Fore.GREEN}{value}{Style.RESET_ALL}")
+    print(
+        f"{colorama.Fore.CYAN}{message}: {colorama.Fore.GREEN}{value}{colorama.Style.RESET_ALL}")
 
 
 def print_action(player_id, action, amount):
@@ -53,7 +74,7 @@ def print_action(player_id, action, amount):
 
 
 def print_table(data, headers):
-    print(tabulate(data, headers, tablefmt="pretty"))
+    print(tabulate.tabulate(data, headers, tablefmt="pretty"))
 
 
 def assign_blinds(players):
@@ -63,6 +84,12 @@ def assign_blinds(players):
     players[small_blind_position]['chips'] -= SMALL_BLIND
     players[big_blind_position]['chips'] -= BIG_BLIND
 
+    # Log the blinds so the pot can be rebuilt from the action log
+    action_log.append('Pre-flop', small_blind_position + 1,
+                      'blind', SMALL_BLIND, SMALL_BLIND)
+    action_log.append('Pre-flop', big_blind_position + 1,
+                      'blind', BIG_BLIND, SMALL_BLIND + BIG_BLIND)
+
     print_header("Blind Assignments")
     print_info("Small Blind", f"Player {small_blind_position + 1}")
     print_info("Big Blind", f"Player {big_blind_position + 1}")
@@ -83,18 +110,20 @@ def deal_cards(deck, num_cards):
     return [deck.pop() for _ in range(num_cards)]
 
 
-def simulate_game(deck, community_cards, my_hand):
+def simulate_game(deck, community_cards, my_hand, num_opponents=NUM_PLAYERS - 1):
     """Simulate a single game of Texas Hold'em from the current state."""
     remaining_cards = 5 - len(community_cards)
     community_cards += deal_cards(deck, remaining_cards)
     my_strength = evaluate_hand_strength(my_hand + community_cards)
     opponent_strengths = []
-    for _ in range(NUM_PLAYERS - 1):
+    for _ in range(num_opponents):
         opponent_hand = deal_cards(deck, 2)
         opponent_strength = evaluate_hand_strength(
             opponent_hand + community_cards)
         opponent_strengths.append(opponent_strength)
-    return 'win' if all(my_strength > opponent_strength for opponent_strength in opponent_strengths) else 'lose'
+    outcome = 'win' if all(my_strength > opponent_strength for opponent_strength in opponent_strengths) else 'lose'
+    # Also report the strongest opponent hand, which the bet size optimizer ranks games by
+    return outcome, max(opponent_strengths, default=0)
 
 
 def calculate_preflop_equity(hole_cards, num_opponents=1, iterations=1000):
@@ -142,23 +171,69 @@ def calculate_preflop_equity(hole_cards, num_opponents=1, iterations=1000):
     return total_wins / total_iterations
 
 
+def preflop_hand_key(hole_cards):
+    """Return the canonical name of a starting hand, e.g. 'AKs', 'T9o' or 'QQ'."""
+    high, low = sorted(hole_cards, key=card_value, reverse=True)
+    if high[0] == low[0]:
+        return high[0] + low[0]
+    return high[0] + low[0] + ('s' if high[1] == low[1] else 'o')
+
+
+def cached_preflop_equity(hole_cards, num_opponents=1):
+    """Return the preflop equity from the warm state, computing and snapshotting it on a miss."""
+    global preflop_equity_table
+    if not 1 <= num_opponents <= MAX_OPPONENTS:
+        return calculate_preflop_equity(hole_cards, num_opponents)
+
+    index = PREFLOP_HAND_INDEX[preflop_hand_key(
+        hole_cards)] * MAX_OPPONENTS + num_opponents - 1
+    equity = preflop_equity_table[index]
+    if math.isnan(equity):
+        equity = calculate_preflop_equity(
+            hole_cards, num_opponents, preflop_iterations(hole_cards))
+        # The mapped table is read-only, so update a copy and snapshot that
+        preflop_equity_table = array('d', preflop_equity_table)
+        preflop_equity_table[index] = equity
+        WarmStart.save_snapshot({'preflop_equity': preflop_equity_table})
+    return equity
+
+
+def preflop_iterations(hole_cards, samples=NUM_SIMULATIONS):
+    """Return the iterations per suit combination that give calculate_preflop_equity at least samples games."""
+    # Suited hands are simulated with one suit combination, everything else with 12
+    suit_combinations = 1 if hole_cards[0][1] == hole_cards[1][1] else 12
+    return -(-samples // suit_combinations)
+
+
+def build_warm_state(samples=NUM_SIMULATIONS):
+    """Precompute the preflop equity of every starting hand against 1 to MAX_OPPONENTS opponents."""
+    global preflop_equity_table
+    table = array('d', [math.nan]) * PREFLOP_TABLE_SIZE
+    for hand_index, hand in enumerate(PREFLOP_HANDS):
+        # Any representative cards will do, calculate_preflop_equity covers the suit combinations
+        hole_cards = [hand[0] + 'S', hand[1] +
+                      ('S' if hand.endswith('s') else 'H')]
+        # Every entry gets at least as many games as the simulation it replaces
+        iterations = preflop_iterations(hole_cards, samples)
+        equities = [calculate_preflop_equity(hole_cards, num_opponents, iterations)
+                    for num_opponents in range(1, MAX_OPPONENTS + 1)]
+        table[hand_index * MAX_OPPONENTS:(hand_index + 1) * MAX_OPPONENTS] = array('d', equities)
+        print(f"{hand}: " + ", ".join(f"{equity:.2%}" for equity in equities))
+    preflop_equity_table = table
+    WarmStart.save_snapshot({'preflop_equity': table})
+
+
 def evaluate_hand_strength(hand):
     """Evaluate the strength of a hand using phevaluator."""
     if len(hand) < 5:
         return None  # Not enough cards to evaluate
 
     # Ensure the card format is correct for phevaluator
-    hand = [Card(card) for card in hand]
-
-    # Generate all possible combinations of 5 cards from the available cards
-    all_combinations = combinations(hand, 5)
+    hand = [phevaluator.Card(card) for card in hand]
 
-    # Evaluate all combinations and keep track of the best (lowest) rank
-    best_rank = 7462  # Highest possible rank in phevaluator, represents the weakest hand
-    for combo in all_combinations:
-        rank = evaluate_cards(*combo)
-        if rank < best_rank:
-            best_rank = rank
+    # phevaluator's lookup tables already return the best 5-card rank (lowest) for
+    # 5, 6 or 7 cards, so there's no need to evaluate every combination separately
+    best_rank = phevaluator.evaluate_cards(*hand)
 
     # Calculate hand strength based on the best (lowest) rank found
     hand_strength = 1 - (best_rank / 7462)
@@ -221,22 +296,61 @@ def model_opponent(opponent_actions, opponent_history):
         return 'passive'
 
 
-def advanced_bluffing_strategy(opponent_profile, betting_history, hand_strength):
+def advanced_bluffing_strategy(opponent_profile, action_log, hand_strength):
     if opponent_profile == 'passive' and hand_strength > 0.6:  # Adjust threshold as needed
         return True  # Bluff against passive players with weak hands
     return False
 
 
-# Helper function to calculate pot odds
+def optimize_bet_size(showdowns, pot_size, call_amount, player_stack, opponent_stack, opponent_ids):
+    """Return the EV-maximizing raise (on top of any call) from BET_SIZE_GRID and its expected value.
+
+    EVs are relative to folding. showdowns is the sample from simulate_showdowns; it is
+    simulated once and reweighted for each candidate size's calling range.
+    """
+    wins, strongest_opponents = showdowns
+    pot_after_call = pot_size + call_amount
+
+    # We can never win more than we and the deepest live opponent both have behind
+    max_bet = min(player_stack - call_amount, opponent_stack)
+    if max_bet <= 0:
+        return 0, float(wins.mean()) * pot_after_call - call_amount
+
+    # Evaluate every candidate at once, including shoving what's effectively left.
+    # Sizes are whole chips, since that's all the raise prompt accepts.
+    sizes = numpy.clip(numpy.asarray(BET_SIZE_GRID) * pot_after_call,
+                       min(MINIMUM_BET, max_bet), max_bet)
+    sizes = numpy.unique(numpy.round(numpy.append(sizes, max_bet)))
+    bet_fractions = sizes / max(pot_after_call, 1)
+
+    # The bet only takes the pot down right away if every remaining opponent folds.
+    # Without any known opponents there is no fold equity to count on.
+    fold_probability = numpy.ones_like(
+        sizes) if opponent_ids else numpy.zeros_like(sizes)
+    for opponent_id in opponent_ids:
+        fold_probability *= online_model.fold_probabilities(
+            opponent_id, bet_fractions)
+
+    # Opponents fold their weakest hands first, so bigger bets are only called by the
+    # stronger part of their range. With the games sorted by the strongest opponent hand,
+    # the equity against each size's calling range is the win rate over a suffix.
+    wins = wins[numpy.argsort(strongest_opponents, kind='stable')]
+    wins_from = numpy.append(numpy.cumsum(wins[::-1])[::-1], 0)
+    folded = numpy.minimum(
+        (fold_probability * len(wins)).astype(int), len(wins) - 1)
+    called_equity = wins_from[folded] / (len(wins) - folded)
+
+    # When called we win the pot plus both bets with our equity; either way we've put in
+    # the call and the raise
+    called_ev = called_equity * \
+        (pot_after_call + 2 * sizes) - (call_amount + sizes)
+    evs = fold_probability * pot_size + (1 - fold_probability) * called_ev
+
+    best = int(numpy.argmax(evs))
+    return int(sizes[best]), float(evs[best])
 
 
-def advanced_bet_sizing(hand_strength, pot_size, opponent_stack):
-    if hand_strength > 0.8:  # Strong hands have lower values
-        return max(pot_size * 2.75, opponent_stack)
-    elif hand_strength > 0.5:
-        return pot_size * 1.5
-    else:
-        return min(pot_size * 0.5, MINIMUM_BET)
+# Helper function to calculate pot odds
 
 
 def calculate_pot_odds(call_amount, pot_size):
@@ -253,10 +367,21 @@ def calculate_pot_odds(call_amount, pot_size):
     return pot_size / call_amount
 
 
-def gto_decision(hand_strength, pot_size, stage, opponent_actions, player_stack, opponent_stack):
+def gto_decision(hand_strength, pot_size, stage, opponent_actions, player_stack, opponent_stack,
+                 opponent_ids=(), showdowns=None, call_amount=0):
     print(f"Hand strength: {hand_strength}, Pot size: {pot_size}")
 
-    opponent_profile = model_opponent(opponent_actions, opponent_history)
+    # Reuse the caller's simulation if it already ran one for this spot
+    if showdowns is None:
+        showdowns = simulate_showdowns(
+            my_hand, community_cards, known_cards, len(opponent_ids) if opponent_ids else NUM_PLAYERS - 1)
+    win_probability = float(showdowns[0].mean())
+
+    # Prefer the online model's up-to-date read on the opponents still in the hand
+    if opponent_ids:
+        opponent_profile = online_model.profile(opponent_ids)
+    else:
+        opponent_profile = model_opponent(opponent_actions, opponent_history)
 
     # Get dynamic GTO thresholds based on the current context
     value_bet_threshold, bluff_threshold = dynamic_gto_table(
@@ -264,23 +389,27 @@ def gto_decision(hand_strength, pot_size, stage, opponent_actions, player_stack,
 
     # Determine if bluffing is a good strategy based on the opponent's profile and hand strength
     should_bluff = advanced_bluffing_strategy(
-        opponent_profile, betting_history, hand_strength)
+        opponent_profile, action_log, hand_strength)
 
     # Determine the action based on hand strength, value bet threshold, and bluffing strategy
-    if hand_strength > value_bet_threshold or should_bluff or monte_carlo_simulation(my_hand, community_cards, known_cards) == 'raise':
+    if hand_strength > value_bet_threshold or should_bluff or recommend_action(win_probability) == 'raise':
         action = 'bet' if hand_strength < value_bet_threshold else 'bluff'
-        bet_size = advanced_bet_sizing(hand_strength, pot_size, opponent_stack)
-        bet_size = scale_bet_by_pot(
-            hand_strength, pot_size, MINIMUM_BET, bet_size)
+        bet_size, bet_ev = optimize_bet_size(
+            showdowns, pot_size, call_amount, player_stack, opponent_stack, opponent_ids)
+        print(f"Expected value of the bet: {bet_ev:.1f}")
+    elif call_amount > 0 and win_probability * (calculate_pot_odds(call_amount, pot_size) + 1) > 1:
+        # Not worth raising, but the pot odds justify calling
+        action = 'call'
+        bet_size = call_amount
     else:
         action = 'check/fold'
         bet_size = 0
 
     print(f"Action: {action}, Bet Size: {bet_size}")
-    return action, bet_size if bet_size > MINIMUM_BET else MINIMUM_BET + bet_size
+    return action, bet_size
 
 
-def predict_opponent_hand(community_cards, opponent_actions, betting_round):
+def predict_opponent_hand(community_cards, opponent_actions, betting_round, opponent_id=None):
     possible_hands = {
         'high_card': 0.15,
         'low_pair': 0.15,
@@ -296,22 +425,28 @@ def predict_opponent_hand(community_cards, opponent_actions, betting_round):
         'other': 0.20
     }
 
+    # Weigh each action by how unusual it is for this opponent, according to the online model
+    raise_weight = call_weight = 1
+    if opponent_id is not None:
+        raise_weight = online_model.action_weight(opponent_id, 'raise')
+        call_weight = online_model.action_weight(opponent_id, 'call')
+
     # Adjust probabilities based on opponent actions and betting round
     for action in opponent_actions:
         if action == 'raise':
             # Aggressive actions might indicate stronger hands
-            possible_hands['high_pair'] += 0.05
-            possible_hands['set'] += 0.04
-            possible_hands['straight'] += 0.03
-            possible_hands['flush'] += 0.03
-            possible_hands['full_house'] += 0.02
-            possible_hands['other'] -= 0.17
+            possible_hands['high_pair'] += 0.05 * raise_weight
+            possible_hands['set'] += 0.04 * raise_weight
+            possible_hands['straight'] += 0.03 * raise_weight
+            possible_hands['flush'] += 0.03 * raise_weight
+            possible_hands['full_house'] += 0.02 * raise_weight
+            possible_hands['other'] -= 0.17 * raise_weight
         elif action == 'call':
             # Passive actions might indicate drawing or mediocre hands
-            possible_hands['straight'] += 0.02
-            possible_hands['flush'] += 0.02
-            possible_hands['low_pair'] += 0.03
-            possible_hands['other'] -= 0.07
+            possible_hands['straight'] += 0.02 * call_weight
+            possible_hands['flush'] += 0.02 * call_weight
+            possible_hands['low_pair'] += 0.03 * call_weight
+            possible_hands['other'] -= 0.07 * call_weight
 
     # Adjust based on the betting round
     if betting_round == 'flop':
@@ -340,6 +475,10 @@ def predict_opponent_hand(community_cards, opponent_actions, betting_round):
     if straight_potential:
         possible_hands['straight'] += 0.05
 
+    # Heavily weighted actions can push a bucket below zero, so clamp before normalizing
+    for hand in possible_hands:
+        possible_hands[hand] = max(possible_hands[hand], 0)
+
     # Normalize probabilities to ensure they sum to 1
     total_prob = sum(possible_hands.values())
     for hand in possible_hands:
@@ -375,37 +514,6 @@ def is_straight_potential(community_cards):
     return False
 
 
-def scale_bet_by_pot(hand_strength, pot_size, min_bet, max_bet):
-    # Scale the bet size based on the hand strength and pot size
-    bet_size = (1 + hand_strength) * pot_size/1.5
-
-    # Ensure the bet size is within the min/max bounds
-    return min(max_bet, max(min_bet, bet_size))
-
-
-def adjust_bet_for_pot_odds(bet_size, hand_strength, pot_size, call_amount):
-    # Calculate the pot odds
-    pot_odds = calculate_pot_odds(call_amount, pot_size)
-    print(
-        f"Bet Size: {bet_size}, Hand Strength: {hand_strength}, Pot Odds: {pot_odds}, Call Amount: {call_amount}")
-
-    if call_amount == 0:  # If there's nothing to call, return the original bet size
-        return bet_size
-
-    if hand_strength < pot_odds:
-        # If the hand isn't strong enough for the pot odds, adjust the bet size down, but not below the minimum bet
-        adjusted_bet = min(bet_size, call_amount)
-        return max(adjusted_bet, MINIMUM_BET)
-
-    elif hand_strength > pot_odds * 2:  # If the hand is much stronger than needed, consider being more aggressive
-        # Increase the bet but cap it at the pot size and ensure it's not below the minimum bet
-        increased_bet = min(bet_size * 1.5, pot_size)
-        return max(increased_bet, MINIMUM_BET)
-
-    # If neither condition is met, return the original bet size
-    return bet_size
-
-
 def user_input(prompt):
     """Get user input and return it."""
     return input(prompt).strip().upper()
@@ -420,18 +528,45 @@ def standardize_card_input(card):
     return card[0].upper() + card[1].upper()
 
 
-def monte_carlo_simulation(my_hand, community_cards, known_cards):
-    """Run a Monte Carlo simulation to recommend an action."""
-    win_count = 0
-    for _ in range(NUM_SIMULATIONS):
+def estimate_win_probability(my_hand, community_cards, known_cards, num_opponents=NUM_PLAYERS - 1):
+    """Run a Monte Carlo simulation and return the estimated probability of winning against num_opponents."""
+    if num_opponents == 0:
+        return 1.0  # Everyone else has folded
+
+    # Preflop this is just the starting hand's equity, which the warm state already has
+    if not community_cards:
+        return cached_preflop_equity(my_hand, num_opponents)
+
+    wins, _ = simulate_showdowns(
+        my_hand, community_cards, known_cards, num_opponents)
+    return float(wins.mean())
+
+
+def simulate_showdowns(my_hand, community_cards, known_cards, num_opponents=NUM_PLAYERS - 1):
+    """Simulate NUM_SIMULATIONS games and return, per game, whether we won and the strongest opponent hand."""
+    wins = numpy.zeros(NUM_SIMULATIONS, dtype=bool)
+    strongest_opponents = numpy.zeros(NUM_SIMULATIONS)
+    for game in range(NUM_SIMULATIONS):
         # Exclude known cards from the deck
         deck = shuffle_deck(known_cards + my_hand + community_cards)
-        outcome = simulate_game(deck, community_cards.copy(), my_hand)
-        if outcome == 'win':
-            win_count += 1
-    win_probability = win_count / NUM_SIMULATIONS
+        outcome, strongest_opponents[game] = simulate_game(
+            deck, community_cards.copy(), my_hand, num_opponents)
+        wins[game] = outcome == 'win'
+    return wins, strongest_opponents
+
+
+def monte_carlo_simulation(my_hand, community_cards, known_cards, win_probability=None):
+    """Run a Monte Carlo simulation to recommend an action."""
+    if win_probability is None:
+        win_probability = estimate_win_probability(
+            my_hand, community_cards, known_cards)
     print(
         f"Based on the simulation, your estimated probability of winning is: {win_probability:.2f}")
+    return recommend_action(win_probability)
+
+
+def recommend_action(win_probability):
+    """Map an estimated probability of winning to an action."""
     # Adjust action recommendation based on probability
     if win_probability > 0.45:
         return 'raise'
@@ -473,6 +608,8 @@ def handle_player_action(player, current_bet, pot_size, my_hand, community_cards
     elif player['id'] == big_blind_position + 1:
         role = "Big Blind"
 
+    chips_before_action = player['chips']
+
     action_valid = False
     while not action_valid:
         # Calculate the amount the player needs to call
@@ -498,20 +635,6 @@ def handle_player_action(player, current_bet, pot_size, my_hand, community_cards
         action = user_input(
             f"{role} {player['id']}, enter your action ({'/'.join(valid_actions)}): ").lower()
 
-        if player['id'] != user_player_number:  # If it's an opponent
-            opponent_history[player['id']] = opponent_history.get(
-                player['id'], []) + [action]
-            betting_history.append(
-                (player['id'], action, current_bet - player['last_bet']))
-
-            top_hands = predict_opponent_hand(
-                community_cards, opponent_history[player['id']], stage)
-            if stage != 'Pre-flop':
-                print_header(
-                    f"Top 5 predicted hand ranges for Player {player['id']}")
-                print_table([(hand, f"{likelihood*100:.1f}%")
-                            for hand, likelihood in top_hands], ["Hand", "Likelihood"])
-
         if action not in valid_actions:
             print("Invalid action. Please try again.")
             continue  # Stay in the loop until a valid action is provided
@@ -564,6 +687,24 @@ def handle_player_action(player, current_bet, pot_size, my_hand, community_cards
                 print("You can't check now. Please choose another action.")
                 continue
 
+    # Log every accepted action, ours included, with the chips actually put in and the resulting pot
+    action_log.append(stage, player['id'], action,
+                      chips_before_action - player['chips'], pot_size)
+
+    if player['id'] != user_player_number:  # If it's an opponent
+        # Only accepted actions count, so a re-entered raise isn't seen twice
+        opponent_history[player['id']] = opponent_history.get(
+            player['id'], []) + [action]
+        online_model.observe(player['id'], action)
+
+        top_hands = predict_opponent_hand(
+            community_cards, opponent_history[player['id']], stage, player['id'])
+        if stage != 'Pre-flop':
+            print_header(
+                f"Top 5 predicted hand ranges for Player {player['id']}")
+            print_table([(hand, f"{likelihood*100:.1f}%")
+                        for hand, likelihood in top_hands], ["Hand", "Likelihood"])
+
     return True, current_bet, pot_size  # Action resolved, return updated state
 
 
@@ -588,16 +729,31 @@ def valid_actions_helper(call_amount, player, valid_actions, stage):
 
 def player_gto_guidance(community_cards, current_bet, known_cards, my_hand, player, pot_size):
     print(f"Your chips: {player['chips']}, pot size: {pot_size}")
+    opponent_ids = [p['id'] for p in players
+                    if p['id'] != player['id'] and p['status'] != 'folded']
+
+    # Simulate once against the opponents still in the hand; the GTO decision and
+    # every candidate bet size below reuse the same games
+    showdowns = None
+    if community_cards:
+        showdowns = simulate_showdowns(
+            my_hand, community_cards, known_cards, len(opponent_ids))
+        win_probability = float(showdowns[0].mean())
+    else:
+        win_probability = estimate_win_probability(
+            my_hand, community_cards, known_cards, len(opponent_ids))
     monte_carlo_action = monte_carlo_simulation(
-        my_hand, community_cards, known_cards)
+        my_hand, community_cards, known_cards, win_probability)
     print(f"Monte Carlo recommended action: {monte_carlo_action}")
     if len(community_cards) >= 3:  # GTO decisions are more relevant post-flop
         combined_cards = my_hand + community_cards
         hand_strength = evaluate_hand_strength(combined_cards)
         stage = 'early' if len(community_cards) <= 3 else 'late'
         player_stack = player['chips']
-        opponent_stack = sum(
-            p['chips'] for p in players if p['id'] != player['id']) / (NUM_PLAYERS - 1)
+        # The effective stack is set by the deepest opponent still in the hand
+        opponent_stack = max((p['chips'] for p in players if p['id'] in opponent_ids),
+                             default=0)
+        call_amount = current_bet - player['last_bet']
         opponent_actions = [p['last_action']
                             for p in players if p['id'] != player['id']]
 
@@ -607,11 +763,12 @@ def player_gto_guidance(community_cards, current_bet, known_cards, my_hand, play
             stage,
             opponent_actions,
             player_stack,
-            opponent_stack
+            opponent_stack,
+            opponent_ids,
+            showdowns,
+            call_amount
         )
 
-        suggested_bet_size = adjust_bet_for_pot_odds(
-            suggested_bet_size, hand_strength, pot_size, current_bet)
         print(
             f"GTO recommended action: {gto_action} with an amount of {suggested_bet_size}")
     else:
@@ -648,43 +805,57 @@ def call_Helper(action_valid, current_bet, player, pot_size, role, stage):
 
 
 # Main Interaction Loop
-pot_size = assign_blinds(players)
-
-known_cards = []
-
-my_hand_input = user_input("Enter your two cards (e.g., 'AS KH'): ").split()
-my_hand = [standardize_card_input(card) for card in my_hand_input]
-known_cards.extend(my_hand)
-print(f"Your hand: {my_hand}")
-
-community_cards = []
-
-preflop_equity = calculate_preflop_equity(my_hand, NUM_PLAYERS - 1)
-print(f"Your estimated preflop equity: {preflop_equity:.2%}")
-
-# Pre-flop betting round
-current_bet = BIG_BLIND  # The initial bet pre-flop is the big blind
-pot_size = betting_round("Pre-flop", players, current_bet,
-                         community_cards, my_hand, known_cards, pot_size)
-
-for stage, num_cards in [("Flop", 3), ("Turn", 1), ("River", 1)]:
-    # Deal stage cards and add to known and community cards
-    round_cards_input = user_input(
-        f"Enter the {stage} cards (e.g., 'AD KH 3D'): ").split()
-    round_cards = [standardize_card_input(card) for card in round_cards_input]
-    community_cards.extend(round_cards)
-    known_cards.extend(round_cards)
-    print(f"\n{stage} cards: {round_cards}")
-    print(f"Community Cards: {community_cards}")
-
-    # Reset current bet for the new betting round
-    current_bet = 0
-    pot_size = betting_round(stage, players, current_bet,
+if __name__ == '__main__':
+    if '--build-warm-state' in sys.argv[1:]:
+        build_warm_state()
+        sys.exit()
+
+    user_player_number = int(
+        input(f"Enter your player number (1-{NUM_PLAYERS}): "))
+    dealer_position = int(
+        input(f"Enter the initial dealer position (1-{NUM_PLAYERS}): ")) - 1
+
+    small_blind_position = (dealer_position + 1) % NUM_PLAYERS
+    big_blind_position = (dealer_position + 2) % NUM_PLAYERS
+
+    action_log.new_hand()
+    pot_size = assign_blinds(players)
+
+    known_cards = []
+
+    my_hand_input = user_input("Enter your two cards (e.g., 'AS KH'): ").split()
+    my_hand = [standardize_card_input(card) for card in my_hand_input]
+    known_cards.extend(my_hand)
+    print(f"Your hand: {my_hand}")
+
+    community_cards = []
+
+    preflop_equity = cached_preflop_equity(my_hand, NUM_PLAYERS - 1)
+    print(f"Your estimated preflop equity: {preflop_equity:.2%}")
+
+    # Pre-flop betting round
+    current_bet = BIG_BLIND  # The initial bet pre-flop is the big blind
+    pot_size = betting_round("Pre-flop", players, current_bet,
                              community_cards, my_hand, known_cards, pot_size)
 
-# Final results
-print("\nFinal round (River) complete.")
-print_header("Final Results")
-final_rank = evaluate_hand_strength(my_hand + community_cards)
-print_info("Your final hand rank",
-           f"{final_rank} ({rank_to_human_readable(final_rank)})")
+    for stage, num_cards in [("Flop", 3), ("Turn", 1), ("River", 1)]:
+        # Deal stage cards and add to known and community cards
+        round_cards_input = user_input(
+            f"Enter the {stage} cards (e.g., 'AD KH 3D'): ").split()
+        round_cards = [standardize_card_input(card) for card in round_cards_input]
+        community_cards.extend(round_cards)
+        known_cards.extend(round_cards)
+        print(f"\n{stage} cards: {round_cards}")
+        print(f"Community Cards: {community_cards}")
+
+        # Reset current bet for the new betting round
+        current_bet = 0
+        pot_size = betting_round(stage, players, current_bet,
+                                 community_cards, my_hand, known_cards, pot_size)
+
+    # Final results
+    print("\nFinal round (River) complete.")
+    print_header("Final Results")
+    final_rank = evaluate_hand_strength(my_hand + community_cards)
+    print_info("Your final hand rank",
+               f"{final_rank} ({rank_to_human_readable(final_rank)})")
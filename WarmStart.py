@@ -0,0 +1,95 @@
+import importlib.util
+import json
+import mmap
+import os
+import sys
+
+# Single file holding everything that is expensive to rebuild on a cold start
+SNAPSHOT_PATH = os.path.join(os.path.dirname(
+    os.path.abspath(__file__)), 'warm_state.snapshot')
+
+# Layout: magic, header size, JSON header ({name: [typecode, offset, nbytes]}), then the
+# raw array buffers, each starting on an 8-byte boundary
+SNAPSHOT_MAGIC = b'PPPWARM\x01'
+HEADER_SIZE_BYTES = 8
+ALIGNMENT = 8
+
+
+def lazy_import(name):
+    """Return a module that is only executed on first attribute access."""
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named '{name}'", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+def _align(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def load_snapshot(path=SNAPSHOT_PATH):
+    """Map the warm state snapshot and return its arrays as read-only memoryviews.
+
+    Nothing is copied: the views point straight into the mapped file, so only the
+    pages that are actually read get loaded. Returns an empty state if there is no
+    usable snapshot.
+    """
+    try:
+        with open(path, 'rb') as snapshot_file:
+            mapped = mmap.mmap(snapshot_file.fileno(), 0,
+                               access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        # Missing or empty snapshots just mean a cold start
+        return {}
+
+    view = memoryview(mapped)
+    try:
+        if bytes(view[:len(SNAPSHOT_MAGIC)]) != SNAPSHOT_MAGIC:
+            return {}
+        header_start = len(SNAPSHOT_MAGIC) + HEADER_SIZE_BYTES
+        header_size = int.from_bytes(
+            view[len(SNAPSHOT_MAGIC):header_start], 'little')
+        header = json.loads(bytes(view[header_start:header_start + header_size]))
+        data_start = _align(header_start + header_size)
+        state = {}
+        for name, (typecode, offset, nbytes) in header.items():
+            start = data_start + offset
+            if start + nbytes > len(view):
+                return {}
+            state[name] = view[start:start + nbytes].cast(typecode)
+        return state
+    except (ValueError, TypeError, AttributeError):
+        # A corrupt snapshot is treated like a missing one
+        return {}
+
+
+def save_snapshot(state, path=SNAPSHOT_PATH):
+    """Write a dict of arrays (array.array or memoryviews) to the snapshot atomically."""
+    header = {}
+    offset = 0
+    for name, values in state.items():
+        values = memoryview(values)
+        header[name] = [values.format, offset, values.nbytes]
+        offset = _align(offset + values.nbytes)
+    header_bytes = json.dumps(header).encode()
+    data_start = _align(len(SNAPSHOT_MAGIC) +
+                        HEADER_SIZE_BYTES + len(header_bytes))
+
+    # Write to a temporary file and swap it in so readers never see a partial file
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'wb') as snapshot_file:
+        snapshot_file.write(SNAPSHOT_MAGIC)
+        snapshot_file.write(len(header_bytes).to_bytes(
+            HEADER_SIZE_BYTES, 'little'))
+        snapshot_file.write(header_bytes)
+        for name, values in state.items():
+            snapshot_file.seek(data_start + header[name][1])
+            snapshot_file.write(memoryview(values).cast('B'))
+    os.replace(temp_path, path)